@@ -1,7 +1,15 @@
+from collections import Counter, deque
+from concurrent.futures import Executor, ProcessPoolExecutor
 import dataclasses
+from datetime import datetime
+import functools
+import io
+import itertools
 import json
+import os
 from pathlib import Path
 import subprocess
+from typing import Callable, ClassVar, Iterable, Iterator, TextIO
 
 import click
 import github
@@ -9,24 +17,135 @@ import github.Repository as ghrepository
 import github.Issue as ghissue
 
 from ruamel.yaml import YAML
+import ruamel.yaml.resolver
 from ruamel.yaml.scalarstring import LiteralScalarString, PlainScalarString
-from ruamel.yaml.comments import CommentedSeq
+import yaml as pyyaml
+
+try:
+    from yaml import CSafeDumper as SafeDumper, CSafeLoader as SafeLoader
+
+    HAVE_LIBYAML = True
+except ImportError:
+    from yaml import SafeDumper, SafeLoader
+
+    HAVE_LIBYAML = False
 
 yaml = YAML(typ=["rt", "string"])
 
 
+class IssueLoader(SafeLoader):
+    """A fast loader resolving plain scalars by the YAML 1.2 rules `ruamel.yaml` uses.
+
+    On its own `pyyaml` follows YAML 1.1, where e.g. `no` and `on` are booleans, so
+    it would read some files differently to the round-trip loader.
+    """
+
+
+def _construct_int(loader: IssueLoader, node: pyyaml.ScalarNode) -> int:
+    # In YAML 1.2 octal needs a 0o prefix, and a leading zero is just decimal
+    value = loader.construct_scalar(node).replace("_", "")
+    sign = -1 if value[0] == "-" else 1
+    value = value.lstrip("+-")
+
+    if value[:2] in ("0b", "0o", "0x"):
+        return sign * int(value, 0)
+    return sign * int(value)
+
+
+# Take the YAML 1.2 resolvers for the tags that `pyyaml` has constructors for
+_LOADER_TAGS = {
+    f"tag:yaml.org,2002:{t}"
+    for t in ("bool", "float", "int", "merge", "null", "timestamp")
+}
+IssueLoader.yaml_implicit_resolvers = {}
+for _versions, _tag, _regexp, _first in ruamel.yaml.resolver.implicit_resolvers:
+    if (1, 2) in _versions and _tag in _LOADER_TAGS:
+        IssueLoader.add_implicit_resolver(_tag, _regexp, _first)
+IssueLoader.add_constructor("tag:yaml.org,2002:int", _construct_int)
+
+
+class _IssueResolver(pyyaml.resolver.Resolver):
+    """Resolves plain scalars the same way as `IssueLoader`."""
+
+    yaml_implicit_resolvers = IssueLoader.yaml_implicit_resolvers
+
+
+_resolver = _IssueResolver()
+
+# Only used to check how strings can be written
+_emitter = pyyaml.emitter.Emitter(None, allow_unicode=True)
+
+
+def needs_literal(s: str) -> bool:
+    """Whether a string is best written as a YAML literal block."""
+    return "\n" in s or len(s) > 80
+
+
+def can_emit_literal(s: str) -> bool:
+    """Whether the `pyyaml` emitter can write a string as a literal block.
+
+    It won't for strings containing e.g. tabs or spaces before a line break, and
+    silently writes them as quoted strings instead.
+    """
+    return _emitter.analyze_scalar(s).allow_block
+
+
+def flow_style(data: list) -> bool:
+    """Whether a list should be written inline.
+
+    Short lists of names are written inline, anything else (e.g. the list of issues) in
+    block style.
+    """
+    return len(data) <= 8 and all(isinstance(v, str) and len(v) < 40 for v in data)
+
+
+def _represent_list(representer, data: list):
+    return representer.represent_sequence(
+        "tag:yaml.org,2002:seq", data, flow_style=flow_style(data)
+    )
+
+
+yaml.representer.add_representer(list, _represent_list)
+
+
+def _scalar_event(value: str | int | None, style: str | None = None):
+    """Create the YAML event for a scalar value."""
+
+    if value is None:
+        return pyyaml.ScalarEvent(None, None, (True, False), "null")
+
+    if isinstance(value, int):
+        return pyyaml.ScalarEvent(None, None, (True, False), str(value))
+
+    # Strings that would be read back as another type (e.g. "true") must be quoted
+    plain = _resolver.resolve(pyyaml.ScalarNode, value, (True, False))
+    return pyyaml.ScalarEvent(
+        None, None, (plain == "tag:yaml.org,2002:str", True), value, style=style
+    )
+
+
+def parse_timestamp(s: str) -> datetime:
+    """Parse an ISO 8601 timestamp from Github."""
+    # Python < 3.11 can't parse the Z suffix Github uses for UTC
+    return datetime.fromisoformat(s.replace("Z", "+00:00"))
+
+
 def comp_newline(a, b):
     """Compare a and b while normalising newlines."""
 
-    if isinstance(a, str):
-        a = a.replace("\r\n", "\n")
-    if isinstance(b, str):
-        b = b.replace("\r\n", "\n")
+    if a == b:
+        return True
 
-    return a == b
+    # Only strings containing a carriage return can compare equal after normalising
+    if not (isinstance(a, str) and isinstance(b, str)):
+        return False
+    if "\r" not in a and "\r" not in b:
+        return False
 
+    return a.replace("\r\n", "\n") == b.replace("\r\n", "\n")
 
-@dataclasses.dataclass(kw_only=True)
+
+@dataclasses.dataclass(kw_only=True, slots=True)
 class Issue:
     """A limited representation of a Github issue."""
 
@@ -36,8 +155,34 @@ class Issue:
     assignees: list[str] | None = None
     labels: list[str] | None = None
 
+    # The GraphQL ID of the issue, needed to modify it, and when it was last modified
+    # on Github. These are not YAML fields.
+    node_id: str | None = dataclasses.field(default=None, repr=False, compare=False)
+    updated_at: datetime | None = dataclasses.field(
+        default=None, repr=False, compare=False
+    )
+
+    # The fields modified by `update`
+    dirty: list[str] = dataclasses.field(
+        default_factory=list, init=False, repr=False, compare=False
+    )
+
+    # Whether each string field needs writing as a literal block, so that long bodies
+    # don't need rescanning every time they are serialised
+    _needs_literal: dict[str, bool] = dataclasses.field(
+        init=False, repr=False, compare=False
+    )
+
+    _FIELD_NAMES: ClassVar[frozenset[str]] = frozenset(
+        {"number", "title", "body", "assignees", "labels"}
+    )
+
     def __post_init__(self):
-        self.dirty: list = []
+        self._needs_literal = {
+            k: needs_literal(v)
+            for k in ("title", "body")
+            if isinstance(v := getattr(self, k), str)
+        }
 
     def to_dict(self, yaml: bool = False, skip_missing: bool = False) -> dict:
         """Output the results to a dictionary.
@@ -53,7 +198,13 @@ class Issue:
             The serialised data.
         """
 
-        d = dataclasses.asdict(self)
+        d = {
+            "number": self.number,
+            "title": self.title,
+            "body": self.body,
+            "assignees": list(self.assignees) if self.assignees else self.assignees,
+            "labels": list(self.labels) if self.labels else self.labels,
+        }
 
         if skip_missing:
             d = {k: v for k, v in d.items() if v is not None}
@@ -62,19 +213,37 @@ class Issue:
             # TODO: munge body
             for k, v in d.items():
                 if isinstance(v, str):
-                    if "\n" in v or len(v) > 80:
+                    if self._is_literal(k, v):
                         d[k] = LiteralScalarString(v)
                     else:
                         d[k] = PlainScalarString(v)
-                if isinstance(v, list):
-                    d[k] = CommentedSeq(v)
-                    d[k].fa.set_flow_style()
 
         return d
 
+    def _is_literal(self, k: str, v: str) -> bool:
+        """Whether the string value `v` of field `k` should be a literal block."""
+
+        # Fall back to checking the value if it was set without going through
+        # `__init__` or `update`
+        literal = self._needs_literal.get(k)
+        return needs_literal(v) if literal is None else literal
+
+    def _yaml_strings(self) -> Iterator[tuple[str, str, bool]]:
+        """The string fields as written to YAML, and whether each is a literal block."""
+
+        for k in ("title", "body"):
+            v = getattr(self, k)
+
+            if isinstance(v, str):
+                # Github sends \r\n newlines which would force a quoted style. These
+                # are normalised when comparing for changes so they are safe to drop.
+                if "\r" in v:
+                    v = v.replace("\r\n", "\n")
+                yield k, v, self._is_literal(k, v)
+
     def _dirty_dict(self):
         """A dict of the dirty values."""
-        return {k: v for k, v in self.to_dict().items() if k in self.dirty}
+        return {k: getattr(self, k) for k in self.dirty}
 
     def update(self, **kwargs) -> None:
         """Update the issue with the given fields and mark them dirty.
@@ -85,23 +254,31 @@ class Issue:
             Updated values of the fields.
         """
 
-        field_names = [f.name for f in dataclasses.fields(self)]
-
         for k, v in kwargs.items():
-            if k not in field_names:
+            if k not in self._FIELD_NAMES:
                 continue
 
             existing_val = getattr(self, k, None)
 
-            # See if the value has changed.
+            # See if the value has changed. Check identity first as that catches the
+            # common case of unset (None) fields cheaply.
             # NOTE: we need to be careful with newlines here as Github sends \r\n
-            if comp_newline(existing_val, v):
+            if existing_val is v or comp_newline(existing_val, v):
                 # Nothing to update
                 continue
 
+            # The REST and GraphQL APIs don't promise to list the labels and assignees
+            # in the same order, and the order has no meaning anyway
+            if isinstance(existing_val, list) and isinstance(v, list):
+                if Counter(existing_val) == Counter(v):
+                    continue
+
             setattr(self, k, v)
             self.dirty.append(k)
 
+            if isinstance(v, str):
+                self._needs_literal[k] = needs_literal(v)
+
     @classmethod
     def from_github(cls, issue: ghissue.Issue) -> "Issue":
         """Create the Issue from a github API issue.
@@ -116,33 +293,328 @@ class Issue:
         Issue
             The converted issue.
         """
-        assignees = [a.login for a in issue.assignees]
-        labels = [l.name for l in issue.labels]
+        # Read the JSON the issue was created from, so that nothing can trigger a
+        # lazy fetch of missing attributes. NOTE: the public `raw_data` property is no
+        # good for this as it always fetches the full issue if it came from a list.
+        raw = issue._rawData
+
+        assignees = [a["login"] for a in raw["assignees"]]
+        labels = [l["name"] for l in raw["labels"]]
 
         return cls(
-            number=issue.number,
-            title=issue.title,
-            body=issue.body,
+            number=raw["number"],
+            title=raw["title"],
+            body=raw["body"],
             assignees=assignees,
             labels=labels,
+            node_id=raw["node_id"],
+            updated_at=parse_timestamp(raw["updated_at"]),
         )
 
     @classmethod
-    def list_to_yaml(cls, issues: list["Issue"]) -> CommentedSeq:
-        """Convert a list of issues into a nicely formatted representation."""
+    def from_graphql(cls, node: dict) -> "Issue":
+        """Create the Issue from a GraphQL issue node.
+
+        Parameters
+        ----------
+        node
+            The GraphQL response for the issue, containing the fields requested in
+            `fetch_issues`.
+
+        Returns
+        -------
+        Issue
+            The converted issue.
+        """
+        assignees = [a["login"] for a in node["assignees"]["nodes"]]
+        labels = [l["name"] for l in node["labels"]["nodes"]]
+
+        return cls(
+            number=node["number"],
+            title=node["title"],
+            # The REST API gives a missing body as null, GraphQL as an empty string
+            body=node["body"] or None,
+            assignees=assignees,
+            labels=labels,
+            node_id=node["id"],
+            updated_at=parse_timestamp(node["updatedAt"]),
+        )
+
+    def yaml_events(self) -> Iterator[pyyaml.Event]:
+        """Generate the YAML events serialising the issue as a mapping.
+
+        This avoids building any intermediate representation of the issue.
+        """
+
+        yield pyyaml.MappingStartEvent(None, None, True, flow_style=False)
+
+        strings = {k: (v, literal) for k, v, literal in self._yaml_strings()}
+
+        for k in ("number", "title", "body", "assignees", "labels"):
+            v = getattr(self, k)
+
+            yield _scalar_event(k)
+
+            if isinstance(v, list):
+                yield pyyaml.SequenceStartEvent(
+                    None, None, True, flow_style=flow_style(v)
+                )
+                for item in v:
+                    yield _scalar_event(item)
+                yield pyyaml.SequenceEndEvent()
+
+            elif isinstance(v, str):
+                v, literal = strings[k]
+                yield _scalar_event(v, style="|" if literal else None)
+
+            else:
+                yield _scalar_event(v)
+
+        yield pyyaml.MappingEndEvent()
+
+    @classmethod
+    def dump_list(cls, issues: Iterable["Issue"], stream: TextIO) -> None:
+        """Write a list of issues as YAML using the fast `pyyaml` emitter.
+
+        Issues are written as soon as they are received, so they can be streamed in
+        from a generator. Without libyaml, rendering is CPU bound so large lists are
+        rendered in chunks of `RENDER_CHUNK_SIZE` issues across multiple processes.
+
+        Parameters
+        ----------
+        issues
+            The issues to write.
+        stream
+            The file to write into.
+        """
+
+        if HAVE_LIBYAML:
+            cls._dump_serial(issues, stream)
+            return
+
+        issues = iter(issues)
+        chunks = iter(lambda: list(itertools.islice(issues, RENDER_CHUNK_SIZE)), [])
+
+        # Only start up worker processes if there is more than one chunk
+        first_chunk = next(chunks, [])
+        if len(first_chunk) < RENDER_CHUNK_SIZE:
+            cls._dump_serial(first_chunk, stream)
+            return
+
+        chunks = itertools.chain([first_chunk], chunks)
+
+        nproc = os.cpu_count() or 1
+
+        with ProcessPoolExecutor(max_workers=nproc) as executor:
+            rendered = bounded_map(executor, _render_issues, chunks, nproc)
+
+            for i, text in enumerate(rendered):
+                if i > 0:
+                    stream.write("\n")
+                stream.write(text)
+
+    @classmethod
+    def _dump_serial(cls, issues: Iterable["Issue"], stream: TextIO) -> None:
+        """Write issues as YAML within this process."""
+
+        for i, issue in enumerate(issues):
+            # Improve the formatting by adding newlines between issues
+            if i > 0:
+                stream.write("\n")
+
+            # Fall back to `ruamel.yaml` for the rare issues with a string `pyyaml` can't
+            # write as a literal block, so that it stays easy to edit
+            strings = list(issue._yaml_strings())
+            if not all(can_emit_literal(v) for _, v, literal in strings if literal):
+                d = issue.to_dict(yaml=True)
+                for k, v, literal in strings:
+                    d[k] = LiteralScalarString(v) if literal else PlainScalarString(v)
+                yaml.dump([d], stream)
+                continue
+
+            # Each issue is emitted as a separate one item list so that we can add the
+            # newlines, which together form the list of all issues
+            events = itertools.chain(
+                [
+                    pyyaml.StreamStartEvent(),
+                    pyyaml.DocumentStartEvent(explicit=False),
+                    pyyaml.SequenceStartEvent(None, None, True, flow_style=False),
+                ],
+                issue.yaml_events(),
+                [
+                    pyyaml.SequenceEndEvent(),
+                    pyyaml.DocumentEndEvent(explicit=False),
+                    pyyaml.StreamEndEvent(),
+                ],
+            )
+            pyyaml.emit(events, stream, Dumper=SafeDumper, allow_unicode=True)
+
+
+# Number of issues rendered by each task when rendering in parallel
+RENDER_CHUNK_SIZE = 500
+
+
+def _render_issues(issues: list[Issue]) -> str:
+    """Render issues as YAML text. Used as a task for worker processes."""
+
+    stream = io.StringIO()
+    Issue._dump_serial(issues, stream)
+
+    return stream.getvalue()
+
+
+CACHE_DIR = (
+    Path(os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache")) / "gh-sync-issues"
+)
+
+
+class GitHubApiCache:
+    """An on-disk cache of the issues in a repository.
+
+    Each issue is stored as `<number>.json` and `index.json` records the latest update
+    time of the pulled issues, which lets pull only fetch the issues changed since.
+
+    Issues fetched individually through the REST API (see `fetch_issue`) also have
+    their ETag stored so that they can be conditionally re-requested. Entries written
+    by pull come from the issue list, which gives no per issue ETag, so they don't
+    benefit from this until they are next fetched individually.
+
+    Parameters
+    ----------
+    repo_name
+        The name of the repo as <owner>/<reponame>.
+    root
+        The directory to store the caches for all repositories in.
+    """
+
+    def __init__(self, repo_name: str, root: Path = CACHE_DIR):
+        self.path = root / repo_name.replace("/", "_")
+
+    def _issue_path(self, number: int) -> Path:
+        return self.path / f"{number}.json"
+
+    def get(self, number: int) -> dict | None:
+        """Get the cache entry for an issue.
 
-        s = [issue.to_dict(yaml=True) for issue in issues]
-        s = CommentedSeq(s)
+        Returns
+        -------
+        entry
+            A dict with the `etag`, `state`, `node_id` and `updated_at` time of the
+            issue and the `issue` itself serialised with `Issue.to_dict`, or None if
+            the issue is not cached.
+        """
+
+        try:
+            with open(self._issue_path(number), "r") as fh:
+                return json.load(fh)
+        except (OSError, ValueError):
+            return None
+
+    def set(self, issue: "Issue", state: str, etag: str | None = None) -> None:
+        """Store an issue in the cache.
+
+        Parameters
+        ----------
+        issue
+            The issue to store.
+        state
+            The Github state of the issue, i.e. "open" or "closed".
+        etag
+            The ETag of the response the issue was fetched from, if any.
+        """
 
-        # Improve the formatting by adding newlines between issues
-        for i in range(1, len(s)):
-            s.yaml_set_comment_before_after_key(i, before="\n")
+        self.path.mkdir(parents=True, exist_ok=True)
 
-        return s
+        entry = {
+            "etag": etag,
+            "state": state,
+            "node_id": issue.node_id,
+            "updated_at": issue.updated_at.isoformat() if issue.updated_at else None,
+            "issue": issue.to_dict(),
+        }
+
+        with open(self._issue_path(issue.number), "w") as fh:
+            json.dump(entry, fh)
+
+    @staticmethod
+    def entry_to_issue(entry: dict) -> "Issue":
+        """Recreate an issue from its cache entry."""
+
+        updated_at = entry.get("updated_at")
+
+        return Issue(
+            **entry["issue"],
+            node_id=entry.get("node_id"),
+            updated_at=datetime.fromisoformat(updated_at) if updated_at else None,
+        )
+
+    def clear(self) -> None:
+        """Remove all issues from the cache."""
+
+        for path in self.path.glob("*.json"):
+            path.unlink()
+
+    def open_issues(self) -> Iterator["Issue"]:
+        """Iterate over the open issues in the cache, newest first."""
+
+        numbers = sorted(
+            (
+                int(path.stem)
+                for path in self.path.glob("*.json")
+                if path.stem.isdigit()
+            ),
+            reverse=True,
+        )
+
+        for number in numbers:
+            entry = self.get(number)
+
+            if entry is not None and entry["state"] == "open":
+                yield self.entry_to_issue(entry)
+
+    def load_index(self) -> dict:
+        """Load the repository level information."""
+
+        try:
+            with open(self.path / "index.json", "r") as fh:
+                return json.load(fh)
+        except (OSError, ValueError):
+            return {}
+
+    def save_index(self, index: dict) -> None:
+        """Save the repository level information."""
+
+        self.path.mkdir(parents=True, exist_ok=True)
+
+        with open(self.path / "index.json", "w") as fh:
+            json.dump(index, fh)
+
+
+# Number of items to request per page from the REST API (this is the maximum allowed)
+PER_PAGE = 100
+
+
+def run_gh(*args: str) -> str:
+    """Run the gh client and return its output.
+
+    Any error messages from gh are passed straight through to the terminal.
+    """
+
+    try:
+        result = subprocess.run(
+            ["gh", *args], check=True, stdout=subprocess.PIPE, text=True
+        )
+    except (OSError, subprocess.CalledProcessError) as e:
+        raise click.ClickException(f"Running `gh {' '.join(args)}` failed.") from e
+
+    return result.stdout.rstrip()
 
 
 _gh: github.Github | None = None
 
+# An access token given explicitly on the command line
+_token: str | None = None
+
 
 def gh() -> github.Github:
     """Get a Github API handle."""
@@ -150,18 +622,26 @@ def gh() -> github.Github:
     global _gh
 
     if _gh is None:
-        # Try and get an access token from the gh client
-        token = subprocess.check_output("gh auth token", shell=True).decode()[:-1]
-        _gh = github.Github(token)
+        # Use a token from the command line or environment if there is one, and only
+        # otherwise try and get an access token from the gh client
+        token = (
+            _token
+            or os.environ.get("GITHUB_TOKEN")
+            or os.environ.get("GH_TOKEN")
+            or run_gh("auth", "token")
+        )
+        _gh = github.Github(token, per_page=PER_PAGE)
 
     return _gh
 
 
+@functools.lru_cache
 def current_repo() -> str:
     """Get the current repo"""
 
-    repo_name = subprocess.check_output("gh repo view --json nameWithOwner", shell=True)
-    repo_name = json.loads(repo_name)["nameWithOwner"]
+    repo_name = run_gh(
+        "repo", "view", "--json", "nameWithOwner", "-q", ".nameWithOwner"
+    )
 
     return repo_name
 
@@ -187,10 +667,420 @@ def resolve_repo(repo: str | None) -> ghrepository.Repository:
     return gh().get_repo(repo)
 
 
+def bounded_map(
+    executor: Executor, fn: Callable, iterable: Iterable, window: int
+) -> Iterator:
+    """Map a function over an iterable in an executor, yielding results in order.
+
+    Unlike `Executor.map` the iterable is consumed lazily, with at most `window` tasks
+    submitted ahead of the consumer, so that neither the inputs nor the results are
+    all held in memory.
+
+    Parameters
+    ----------
+    executor
+        The executor to run the tasks in.
+    fn
+        The function to apply.
+    iterable
+        The arguments to apply it to.
+    window
+        The maximum number of pending tasks.
+
+    Returns
+    -------
+    results
+        An iterator over the results.
+    """
+
+    iterable = iter(iterable)
+
+    pending = deque(
+        executor.submit(fn, item) for item in itertools.islice(iterable, window)
+    )
+
+    while pending:
+        result = pending.popleft().result()
+
+        # Start the next task before handing this result over
+        for item in itertools.islice(iterable, 1):
+            pending.append(executor.submit(fn, item))
+
+        yield result
+
+
+def graphql(query: str, variables: dict) -> dict:
+    """Send a query to the Github GraphQL API.
+
+    Parameters
+    ----------
+    query
+        The GraphQL query.
+    variables
+        Values for the variables used in the query.
+
+    Returns
+    -------
+    response
+        The decoded response, containing `data` and possibly `errors` entries.
+    """
+
+    _, response = gh()._Github__requester.requestJsonAndCheck(
+        "POST", "/graphql", input={"query": query, "variables": variables}
+    )
+
+    return response
+
+
+def graphql_data(response: dict) -> dict:
+    """Get the data from a GraphQL query response, checking for errors.
+
+    Objects that can't be found (e.g. an issue number that is actually a pull request)
+    are returned as null with a `NOT_FOUND` error. These errors are ignored so the
+    caller can deal with the null, but any other error raises an exception.
+
+    Parameters
+    ----------
+    response
+        The response as returned by `graphql`.
+
+    Returns
+    -------
+    data
+        The `data` entry of the response.
+    """
+
+    errors = [e for e in response.get("errors", []) if e.get("type") != "NOT_FOUND"]
+
+    if errors or response.get("data") is None:
+        messages = "\n".join(e.get("message", str(e)) for e in errors)
+        raise click.ClickException(f"GraphQL query failed:\n{messages}")
+
+    return response["data"]
+
+
+# Maximum number of issues to request in a single GraphQL query
+GRAPHQL_BATCH_SIZE = 100
+
+_GRAPHQL_ISSUE_FIELDS = """
+    id
+    updatedAt
+    number
+    title
+    body
+    assignees(first: 100) { nodes { login } }
+    labels(first: 100) { nodes { name } }
+"""
+
+
+def fetch_issues(repo: ghrepository.Repository, numbers: list[int]) -> dict[int, Issue]:
+    """Fetch many issues using batched GraphQL queries.
+
+    Parameters
+    ----------
+    repo
+        The repository to fetch from.
+    numbers
+        The issue numbers to fetch.
+
+    Returns
+    -------
+    issues
+        The fetched issues keyed by number. Any number that could not be fetched (e.g.
+        because it refers to a pull request) is missing.
+    """
+
+    issues = {}
+
+    for start in range(0, len(numbers), GRAPHQL_BATCH_SIZE):
+        batch = numbers[start : start + GRAPHQL_BATCH_SIZE]
+
+        args = "".join(f", $n{i}: Int!" for i in range(len(batch)))
+        fields = "".join(
+            f"i{i}: issue(number: $n{i}) {{ {_GRAPHQL_ISSUE_FIELDS} }}\n"
+            for i in range(len(batch))
+        )
+        query = (
+            f"query($owner: String!, $name: String!{args}) {{\n"
+            f"repository(owner: $owner, name: $name) {{\n{fields}}}\n}}"
+        )
+        variables = {"owner": repo.owner.login, "name": repo.name}
+        variables |= {f"n{i}": n for i, n in enumerate(batch)}
+
+        # Numbers that don't resolve to an issue are given a null node
+        data = graphql_data(graphql(query, variables))
+
+        if data["repository"] is None:
+            raise click.ClickException(f"Could not find repository {repo.full_name}.")
+
+        for node in data["repository"].values():
+            if node is not None:
+                issues[node["number"]] = Issue.from_graphql(node)
+
+    return issues
+
+
+def resolve_node_ids(
+    repo: ghrepository.Repository, labels: set[str], logins: set[str]
+) -> tuple[dict[str, str], dict[str, str]]:
+    """Find the GraphQL IDs of labels and users, creating any missing labels.
+
+    Parameters
+    ----------
+    repo
+        The repository the labels belong to.
+    labels
+        The label names.
+    logins
+        The Github usernames.
+
+    Returns
+    -------
+    label_ids, user_ids
+        The IDs keyed by label name and username.
+    """
+
+    if not labels and not logins:
+        return {}, {}
+
+    labels = sorted(labels)
+    logins = sorted(logins)
+
+    args = "".join(f", $l{i}: String!" for i in range(len(labels)))
+    args += "".join(f", $u{i}: String!" for i in range(len(logins)))
+    label_fields = "".join(
+        f"l{i}: label(name: $l{i}) {{ id }}\n" for i in range(len(labels))
+    )
+    user_fields = "".join(
+        f"u{i}: user(login: $u{i}) {{ id }}\n" for i in range(len(logins))
+    )
+    query = (
+        f"query($owner: String!, $name: String!{args}) {{\n"
+        f"repository(owner: $owner, name: $name) {{\nid\n{label_fields}}}\n"
+        f"{user_fields}}}"
+    )
+    variables = {"owner": repo.owner.login, "name": repo.name}
+    variables |= {f"l{i}": label for i, label in enumerate(labels)}
+    variables |= {f"u{i}": login for i, login in enumerate(logins)}
+
+    # Unknown labels and users give null nodes and are dealt with below
+    data = graphql_data(graphql(query, variables))
+
+    if data["repository"] is None:
+        raise click.ClickException(f"Could not find repository {repo.full_name}.")
+
+    # Check the users first so a bad login doesn't leave behind new labels
+    user_ids = {}
+    for i, login in enumerate(logins):
+        node = data[f"u{i}"]
+        if node is None:
+            raise click.ClickException(f"Could not find Github user {login!r}.")
+        user_ids[login] = node["id"]
+
+    label_ids = {}
+    for i, label in enumerate(labels):
+        node = data["repository"][f"l{i}"]
+        if node is None:
+            click.echo(f"Creating label {label!r}.")
+            node = {"id": repo.create_label(label, "ededed").node_id}
+        label_ids[label] = node["id"]
+
+    return label_ids, user_ids
+
+
+def update_issues(
+    repo: ghrepository.Repository, updates: list[tuple[Issue, dict]]
+) -> dict[int, str]:
+    """Push the dirty fields of existing issues to Github.
+
+    The updates are sent as batches of GraphQL mutations rather than one request per
+    issue. An issue that fails to update doesn't stop the others being updated.
+
+    Parameters
+    ----------
+    repo
+        The repository the issues belong to.
+    updates
+        Pairs of modified issues and their dirty values (as given by
+        `Issue._dirty_dict`). The issues must have their `node_id` set to the ID of
+        an Issue node, so pull requests can't be updated this way (see `edit_issue`).
+
+    Returns
+    -------
+    failures
+        The error message for each issue number that failed to update.
+    """
+
+    dirty_dicts = [dirty for _, dirty in updates]
+
+    label_ids, user_ids = resolve_node_ids(
+        repo,
+        {label for d in dirty_dicts for label in d.get("labels") or []},
+        {login for d in dirty_dicts for login in d.get("assignees") or []},
+    )
+
+    inputs = []
+    for issue, dirty in updates:
+        input_ = {"id": issue.node_id}
+
+        if "title" in dirty:
+            input_["title"] = dirty["title"]
+        if "body" in dirty:
+            input_["body"] = dirty["body"] or ""
+        if "labels" in dirty:
+            input_["labelIds"] = [label_ids[l] for l in dirty["labels"] or []]
+        if "assignees" in dirty:
+            input_["assigneeIds"] = [user_ids[a] for a in dirty["assignees"] or []]
+
+        inputs.append(input_)
+
+    failures = {}
+
+    for start in range(0, len(inputs), GRAPHQL_BATCH_SIZE):
+        batch = inputs[start : start + GRAPHQL_BATCH_SIZE]
+        numbers = [issue.number for issue, _ in updates[start : start + len(batch)]]
+
+        args = ", ".join(f"$i{i}: UpdateIssueInput!" for i in range(len(batch)))
+        fields = "".join(
+            f"u{i}: updateIssue(input: $i{i}) {{ issue {{ number }} }}\n"
+            for i in range(len(batch))
+        )
+        query = f"mutation({args}) {{\n{fields}}}"
+        variables = {f"i{i}": input_ for i, input_ in enumerate(batch)}
+
+        try:
+            response = graphql(query, variables)
+        except github.GithubException as e:
+            failures |= {n: str(e) for n in numbers}
+            continue
+
+        # Each mutation that failed gives a null result, and its errors have a path
+        # starting with its alias. Errors without a path apply to the whole batch.
+        messages = {}
+        for e in response.get("errors", []):
+            alias = (e.get("path") or [None])[0]
+            messages.setdefault(alias, []).append(e.get("message", str(e)))
+
+        data = response.get("data") or {}
+        for i, number in enumerate(numbers):
+            if data.get(f"u{i}") is None:
+                failures[number] = "\n".join(
+                    messages.get(f"u{i}") or messages.get(None) or ["Unknown error"]
+                )
+
+    return failures
+
+
+def edit_issue(repo: ghrepository.Repository, number: int, dirty: dict) -> None:
+    """Push the dirty fields of an existing issue to Github with the REST API.
+
+    Unlike `update_issues` this also works for pull requests.
+
+    Parameters
+    ----------
+    repo
+        The repository the issue belongs to.
+    number
+        The issue number.
+    dirty
+        The dirty values (as given by `Issue._dirty_dict`).
+    """
+
+    # Fields are cleared by setting them empty rather than null
+    empty = {"title": "", "body": "", "assignees": [], "labels": []}
+    input_ = {k: empty[k] if v is None else v for k, v in dirty.items() if k in empty}
+
+    gh()._Github__requester.requestJsonAndCheck(
+        "PATCH", f"{repo.url}/issues/{number}", input=input_
+    )
+
+
+def fetch_issue(
+    repo: ghrepository.Repository, number: int, cache: GitHubApiCache
+) -> Issue:
+    """Fetch a single issue with the REST API, avoiding a download if it is cached.
+
+    Parameters
+    ----------
+    repo
+        The repository to fetch from.
+    number
+        The issue number.
+    cache
+        The cache for this repository. If it has an ETag for the issue the request is
+        made conditional on it, and the cached copy used if the issue is unchanged.
+
+    Returns
+    -------
+    issue
+        The fetched issue.
+    """
+
+    entry = cache.get(number)
+    headers = {"If-None-Match": entry["etag"]} if entry and entry["etag"] else {}
+
+    response_headers, data = gh()._Github__requester.requestJsonAndCheck(
+        "GET", f"{repo.url}/issues/{number}", headers=headers
+    )
+
+    # A "304 Not Modified" response has no body
+    if data is None:
+        return cache.entry_to_issue(entry)
+
+    gh_issue = gh().create_from_raw_data(ghissue.Issue, data, response_headers)
+    issue = Issue.from_github(gh_issue)
+    cache.set(issue, gh_issue.state, response_headers.get("etag"))
+
+    return issue
+
+
+def load_issues(path: Path, round_trip: bool = False) -> list:
+    """Load the list of issues from a YAML file.
+
+    Parameters
+    ----------
+    path
+        The file to load.
+    round_trip
+        Load with `ruamel.yaml` preserving the formatting and comments so that the
+        file can be written back out. Otherwise use the much faster `pyyaml` loader.
+
+    Returns
+    -------
+    issues
+        The issues as a list of dicts. An empty file gives an empty list.
+    """
+
+    with open(path, "r") as fh:
+        if round_trip:
+            issues = yaml.load(fh)
+        else:
+            issues = pyyaml.load(fh, Loader=IssueLoader)
+
+    if issues is None:
+        return []
+
+    if not isinstance(issues, list):
+        raise click.UsageError(f"{path} must contain a list of issues.")
+
+    return issues
+
+
+@click.option(
+    "--token",
+    help=(
+        "A Github access token. If not given, the GITHUB_TOKEN or GH_TOKEN environment "
+        "variables are used, or else the token of the gh client."
+    ),
+    default=None,
+    type=str,
+)
 @click.group
-def cli():
+def cli(token: str | None):
     """A command for synchronizing issues to and from a local YAML file."""
-    pass
+
+    global _token
+    _token = token
 
 
 @click.argument("output", type=click.Path(dir_okay=False, path_type=Path))
@@ -203,20 +1093,52 @@ def cli():
     default=None,
     type=str,
 )
+@click.option(
+    "--refresh",
+    help="Fetch every issue rather than only those changed since the last pull.",
+    is_flag=True,
+)
 @cli.command()
-def pull(output: Path, repo: str):
+def pull(output: Path, repo: str, refresh: bool):
     """Fetch the issues and save as yaml into OUTPUT."""
 
     repo = resolve_repo(repo)
 
-    gh_issues = repo.get_issues()
+    cache = GitHubApiCache(repo.full_name)
+    index = cache.load_index()
 
-    issues = [Issue.from_github(issue) for issue in gh_issues]
+    # Fetch the issues one page after another, newest first, by following the links
+    # Github gives. An issue updated meanwhile then moves onto a page that has already
+    # been fetched, which only means other issues are seen twice. Its new update time
+    # is later than any seen here, so the next pull fetches it. Fetching pages
+    # concurrently or oldest first could instead skip an issue, which would then be
+    # missing from the cache until the next refresh.
+    kwargs = {"state": "all", "sort": "updated", "direction": "desc"}
 
-    with open(output, "w") as fh:
-        yaml_issue_list = Issue.list_to_yaml(issues)
+    if refresh or "last_updated_at" not in index:
+        cache.clear()
+        last_updated_at = None
+    else:
+        # Only fetch the issues updated since the last pull, including closed ones so
+        # they can be removed from the cache. Using Github's own timestamps for this
+        # means it doesn't matter if the local clock is off.
+        last_updated_at = datetime.fromisoformat(index["last_updated_at"])
+        kwargs["since"] = last_updated_at
+
+    gh_issues = repo.get_issues(**kwargs)
+
+    for gh_issue in gh_issues:
+        issue = Issue.from_github(gh_issue)
+        cache.set(issue, gh_issue.state)
 
-        yaml.dump(yaml_issue_list, stream=fh)
+        if last_updated_at is None or issue.updated_at > last_updated_at:
+            last_updated_at = issue.updated_at
+
+    if last_updated_at is not None:
+        cache.save_index({"last_updated_at": last_updated_at.isoformat()})
+
+    with open(output, "w") as fh:
+        Issue.dump_list(cache.open_issues(), fh)
 
 
 @click.argument("input", type=click.Path(exists=True, dir_okay=False, path_type=Path))
@@ -255,35 +1177,60 @@ def push(input: Path, repo: str, dry_run: bool, update_input: bool):
     will be created if they don't exist already).
     """
 
-    with open(input, "r") as fh:
-        issues = yaml.load(fh)
+    # Only use the slower round-trip loader if we may need to write the file back
+    issues = load_issues(input, round_trip=update_input and not dry_run)
+
+    if not issues:
+        click.echo("No issues in input file.")
+        return
 
     repo = resolve_repo(repo)
 
     new_issues_added = False
+    updates = []
+    pull_updates = []
+
+    cache = GitHubApiCache(repo.full_name)
+
+    # Fetch all the existing issues at once rather than one request per issue
+    existing_issues = fetch_issues(
+        repo, [int(issue["number"]) for issue in issues if "number" in issue]
+    )
 
     for issue in issues:
         # If number is in there the issue currently exists
         if "number" in issue:
-            gh_issue = repo.get_issue(int(issue["number"]))
-            existing_issue = Issue.from_github(gh_issue)
+            number = int(issue["number"])
+            existing_issue = existing_issues.get(number)
+
+            # Fallback to the REST API for anything GraphQL could not find, which
+            # means it is a pull request and so must be updated with REST too
+            is_pull = existing_issue is None
+            if is_pull:
+                existing_issue = fetch_issue(repo, number, cache)
 
             existing_issue.update(**issue)
 
             if not existing_issue.dirty:
                 continue
 
-            click.echo(f"=== Updating existing issue (#{existing_issue.number}) ===")
-            click.echo("Changes:")
-            click.echo(yaml.dumps(existing_issue._dirty_dict()))
-            click.echo("")
+            dirty = existing_issue._dirty_dict()
 
+            # Build up the whole summary to output it in one go
+            lines = [
+                f"=== Updating existing issue (#{existing_issue.number}) ===",
+                "Changes:",
+                yaml.dumps(dirty),
+                "",
+            ]
+
+            # Updates are applied together once all the issues have been processed
             if not dry_run:
-                gh_issue.edit(**existing_issue._dirty_dict())
-                click.echo("Updated.")
+                (pull_updates if is_pull else updates).append((existing_issue, dirty))
             else:
-                click.echo("Not updated (dry run).")
-            click.echo("")
+                lines += ["Not updated (dry run).", ""]
+
+            click.echo("\n".join(lines))
 
         else:
             new_issue = Issue(**issue)
@@ -291,27 +1238,56 @@ def push(input: Path, repo: str, dry_run: bool, update_input: bool):
             if new_issue.title is None:
                 raise click.UsageError("All issues must have a title.")
 
-            click.echo(f"=== Adding new issue ===")
-            click.echo(yaml.dumps(new_issue.to_dict(yaml=True, skip_missing=True)))
-            click.echo("")
+            # Output the summary in one go before adding the issue
+            lines = [
+                "=== Adding new issue ===",
+                yaml.dumps(new_issue.to_dict(yaml=True, skip_missing=True)),
+                "",
+            ]
+            click.echo("\n".join(lines))
 
             if not dry_run:
                 gh_issue = repo.create_issue(**new_issue.to_dict(skip_missing=True))
                 issue_number = gh_issue.number
-                issue.insert(0, "number", issue_number)
-                click.echo(f"Added (#{issue_number}).")
+                if update_input:
+                    issue.insert(0, "number", issue_number)
+                click.echo(f"Added (#{issue_number}).\n")
                 new_issues_added = True
             else:
-                click.echo(f"Not added (dry run).")
-            click.echo("")
-
-    if new_issues_added:
-        if update_input:
-            click.echo("=== Updating input file ===")
-            with open(input, "w") as fh:
-                yaml.dump(issues, stream=fh)
-        else:
-            click.echo("=== Not updating input file. UPDATE MANUALLY ===")
+                click.echo("Not added (dry run).\n")
+
+    try:
+        if updates or pull_updates:
+            click.echo("=== Updating existing issues ===")
+            failures = update_issues(repo, updates) if updates else {}
+
+            for issue, dirty in pull_updates:
+                try:
+                    edit_issue(repo, issue.number, dirty)
+                except github.GithubException as e:
+                    failures[issue.number] = str(e)
+
+            updated = [
+                f"#{issue.number}"
+                for issue, _ in updates + pull_updates
+                if issue.number not in failures
+            ]
+            if updated:
+                click.echo(f"Updated ({', '.join(updated)}).\n")
+
+            if failures:
+                messages = "\n".join(f"#{n}: {m}" for n, m in failures.items())
+                raise click.ClickException(f"Failed to update issues:\n{messages}")
+    finally:
+        # Record the numbers of the new issues even if updating failed, otherwise they
+        # would be created again by the next push
+        if new_issues_added:
+            if update_input:
+                click.echo("=== Updating input file ===")
+                with open(input, "w") as fh:
+                    yaml.dump(issues, stream=fh)
+            else:
+                click.echo("=== Not updating input file. UPDATE MANUALLY ===")
 
 
 if __name__ == "__main__":